@@ -22,9 +22,30 @@ Required:
 
 Window & server friendliness:
   - TTN_AFTER_DAYS (default 2): sliding window; script also resumes from last saved timestamp
+  - TTN_FIELD_MASK (default: received_at/f_port/rx_metadata/decoded_payload): Storage field mask;
+    set it empty to pull full uplink objects
+  - DEVICE_LIST_TTL_HOURS (default 6): reuse the discovered device list from
+    .cache/ttn_devices.json (0 = always query TTN; DEVS_REFRESH=1 forces one refresh)
+  - DEV_INCLUDE (default .*), DEV_EXCLUDE (empty): regexes that select which devices are
+    pulled and shown (excluded devices are never requested)
   - DELAY_BETWEEN_DEVICES (default 2.0s): inter-device pause
   - JITTER_MAX_SECONDS (default 0.7s): random jitter added to the pause
+  - PULL_WORKERS (default 1): devices pulled concurrently (each worker keeps the pause)
   - MAX_RETRIES (default 5), BACKOFF_BASE (default 1.2s): HTTP retry/backoff tuning
+    (a Retry-After header from TTN takes precedence over the exponential wait)
+  - RETRY_AFTER_MAX (default 60s): longest Retry-After honored; if TTN asks for more,
+    the device is skipped for this run instead of sleeping
+  - TTN_RPM (default 0 = off): shared requests/minute budget for all workers; adapted
+    at runtime (+0.5 per success, halved on 429/5xx, not below TTN_RPM_MIN, default 6);
+    TTN_BURST (default 1) requests may leave back-to-back before pacing applies
+
+Dashboard:
+  - MAX_PLOT_POINTS (default 2000): longer series are LTTB-downsampled before plotting (0 = off)
+  - PLOT_CACHE_DIR (default .cache/plots): per-device chart tiles are reused while the
+    device's rows and this script are unchanged (empty = off)
+
+Storage:
+  - WRITE_CSV (default 1): also write data/<device>.csv next to the parquet (0 = parquet only)
 
 Modes:
   - RUN_DASH=1 (default) → build dashboard
@@ -33,21 +54,45 @@ Modes:
 
 Outputs
 -------
-- data/<device>.parquet and data/<device>.csv (merged & deduplicated)
+- data/<device>.parquet and data/<device>.csv (merged & deduplicated; csv unless WRITE_CSV=0)
 - data/<device>_raw.ndjson (optional append & timestamped snapshots)
 - assets/build/data.html (main dashboard), assets/build/debug.html (recent rows)
 - assets/build/devices_used.txt and assets/build/devices_used.csv (health)
 """
 
-import os, json, time, pathlib, requests, pandas as pd
+import os, json, time, pathlib, hashlib, shutil, requests, pandas as pd
+import numpy as np
+import pyarrow.parquet as pq
 import plotly.express as px, plotly.io as pio
 import plotly.graph_objects as go
+from plotly.offline import get_plotlyjs_version
 from datetime import datetime, timedelta, timezone
 from urllib.parse import quote
 from typing import List, Dict, Tuple, Optional
 from pathlib import Path
+from contextlib import ExitStack
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import random
 import re
+import threading
+from email.utils import parsedate_to_datetime
+import html as _html
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+# Fast JSON decoding: orjson when installed (parses bytes directly), stdlib json otherwise.
+try:
+    import orjson
+
+    def _json_loads(s):
+        """orjson.loads, retried with stdlib json for input orjson rejects (e.g. NaN literals)."""
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            return json.loads(s)
+except ImportError:
+    _json_loads = json.loads
 
 # ---------------- .env loading (dotenv optional, with fallback parser) ----------------
 def _load_env_file(path: Path, override: bool = False) -> bool:
@@ -116,24 +161,56 @@ def _require_env(name: str) -> str:
 APP   = _require_env("TTN_APP_ID")
 REG   = _require_env("TTN_REGION")
 KEY   = _require_env("TTN_API_KEY")
-HDRS  = {"Authorization": f"Bearer {KEY}"}
+# Offer every content coding urllib3 can decode here (br/zstd only if brotli/zstandard are installed).
+HDRS  = {"Authorization": f"Bearer {KEY}", "Accept-Encoding": ACCEPT_ENCODING}
 
 AFTER_DAYS = int(os.environ.get("TTN_AFTER_DAYS", "2"))
 AFTER = (datetime.now(timezone.utc) - timedelta(days=AFTER_DAYS)).strftime("%Y-%m-%dT%H:%M:%SZ")
 
+# Ask TTN Storage only for the uplink fields we use (smaller pages, less JSON to parse).
+# The top-level received_at stays in the mask: _best_ts prefers it and persisted rows are keyed on it.
+# An empty TTN_FIELD_MASK requests the full uplink objects (e.g. for raw NDJSON debugging).
+FIELD_MASK = os.environ.get(
+    "TTN_FIELD_MASK",
+    "received_at,up.uplink_message.received_at,up.uplink_message.f_port,"
+    "up.uplink_message.rx_metadata,up.uplink_message.decoded_payload",
+).strip()
+
 # Conservative defaults to avoid rate-limit or bans in multi-device runs.
 DELAY_BETWEEN_DEVICES = float(os.environ.get("DELAY_BETWEEN_DEVICES", "2.0"))
 JITTER_MAX_SECONDS    = float(os.environ.get("JITTER_MAX_SECONDS", "0.7"))
+# Devices pulled concurrently (1 = strictly one after another; each worker keeps the pause).
+PULL_WORKERS = max(1, int(os.environ.get("PULL_WORKERS", "1")))
+
+# One pooled session for all TTN calls (keep-alive: no TCP/TLS handshake per device/page).
+# Retries stay in _do_get_with_retries, so the adapter itself does not retry.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max(8, PULL_WORKERS), max_retries=0))
 
 DEBUG_RECENT_MINUTES = int(os.environ.get("DEBUG_RECENT_MINUTES", "90"))
 STALE_HOURS  = int(os.environ.get("STALE_HOURS", "3"))
 DEV_INCLUDE  = os.environ.get("DEV_INCLUDE", ".*")
 DEV_EXCLUDE  = os.environ.get("DEV_EXCLUDE", "")
 
+# Discovered TTN device list is cached in .cache/ (hours; 0 = always query TTN).
+DEVICE_LIST_TTL_HOURS = float(os.environ.get("DEVICE_LIST_TTL_HOURS", "6"))
+DEVS_REFRESH = os.environ.get("DEVS_REFRESH", "0") == "1"
+
+# Upper bound of points per plotted line (LTTB downsampling above that; 0 = off).
+MAX_PLOT_POINTS = int(os.environ.get("MAX_PLOT_POINTS", "2000"))
+
+# Cache of rendered chart tiles per device (reused while the device's rows are unchanged; empty = off).
+PLOT_CACHE_DIR = os.environ.get("PLOT_CACHE_DIR", ".cache/plots")
+# Tiles rendered by another version of this script are never reused.
+PLOT_RENDER_VERSION = hashlib.sha1(Path(__file__).read_bytes()).hexdigest()[:12]
+
 # Raw NDJSON capture switches (useful for debugging).
 RAW_APPEND   = os.environ.get("RAW_APPEND", "0") == "1"
 RAW_SNAPSHOT = os.environ.get("RAW_SNAPSHOT", "0") == "1"
 
+# CSV mirror of each parquet (published with the data; 0 = parquet only, an existing csv goes stale).
+WRITE_CSV = os.environ.get("WRITE_CSV", "1") == "1"
+
 # OFFLINE mode: read only local files, no HTTP calls at all.
 OFFLINE = os.environ.get("OFFLINE", "0") == "1"
 
@@ -183,7 +260,7 @@ def list_ttn_devices(app: str) -> List[str]:
         params = {"limit": "100"}
         if page:
             params["page"] = page
-        r = requests.get(url, headers=HDRS, params=params, timeout=30)
+        r = SESSION.get(url, headers=HDRS, params=params, timeout=30)
         r.raise_for_status()
         js = r.json() if r.text.strip() else {}
         for ed in js.get("end_devices", []):
@@ -195,14 +272,54 @@ def list_ttn_devices(app: str) -> List[str]:
             break
     return sorted(set(devs))
 
+def cached_ttn_devices(app: str) -> List[str]:
+    """
+    list_ttn_devices() behind a small cache in .cache/ttn_devices.json (git-ignored, never published).
+
+    The cache stores app id and fetch time (not relying on file mtime, which a
+    fresh checkout resets). It is reused for DEVICE_LIST_TTL_HOURS unless
+    DEVS_REFRESH=1; a failed discovery falls back to a stale cache if present.
+    """
+    cache = Path(".cache") / "ttn_devices.json"
+    cached = None
+    try:
+        cached = json.loads(cache.read_text(encoding="utf-8"))
+        if cached.get("app") != app:
+            cached = None
+    except (OSError, ValueError, AttributeError):
+        cached = None
+    if cached and not DEVS_REFRESH and DEVICE_LIST_TTL_HOURS > 0:
+        age_h = (time.time() - float(cached.get("fetched_at", 0))) / 3600
+        if age_h < DEVICE_LIST_TTL_HOURS:
+            devs = list(cached.get("devices", []))
+            print(f"Using cached device list ({len(devs)} devices, {age_h:.1f}h old; DEVS_REFRESH=1 to refresh)")
+            return devs
+    try:
+        devs = list_ttn_devices(app)
+    except requests.RequestException as e:
+        if not cached:
+            raise
+        print(f"WARN: device discovery failed ({e}); using cached list")
+        return list(cached.get("devices", []))
+    try:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        cache.write_text(json.dumps({"app": app, "fetched_at": time.time(), "devices": devs}), encoding="utf-8")
+    except OSError as e:
+        print(f"WARN: device list cache not written: {e}")
+    return devs
+
 # Resolve device list (explicit ENV > local OFFLINE > TTN discovery).
 DEVICES_ENV = os.environ.get("DEVICES", "").strip()
 if DEVICES_ENV:
     DEVS = [d for d in DEVICES_ENV.split() if d.strip()]
 else:
-    DEVS = list_local_devices() if OFFLINE else list_ttn_devices(APP)
+    DEVS = list_local_devices() if OFFLINE else cached_ttn_devices(APP)
 DEVS = sorted(set(DEVS))
 
+# DEV_INCLUDE/DEV_EXCLUDE prune the list before any pull (excluded devices cause no HTTP calls).
+_INC_RE = re.compile(DEV_INCLUDE); _EXC_RE = re.compile(DEV_EXCLUDE) if DEV_EXCLUDE else None
+DEVS = [d for d in DEVS if _INC_RE.search(d) and not (_EXC_RE and _EXC_RE.search(d))]
+
 # Write initial device list (will be overwritten later by the health report).
 try:
     (ASSETS_BUILD / "devices_used.txt").write_text("\n".join(DEVS), encoding="utf-8")
@@ -210,40 +327,40 @@ except Exception:
     pass
 
 # ---------------- Helpers / Parsers ----------------
-def _robust_json_lines(raw_text: str):
+def _unwrap_result(o) -> Optional[dict]:
+    """Unwrap TTN's { "result": {...} } envelope; None for non-objects."""
+    if isinstance(o, dict) and "result" in o and isinstance(o["result"], dict):
+        o = o["result"]
+    return o if isinstance(o, dict) else None
+
+def _parse_json_line(ln: bytes) -> Optional[dict]:
     """
-    Parse TTN Storage text responses robustly:
-    - Accepts NDJSON and SSE lines like 'data: {...}'.
-    - Unwraps a JSON wrapper { "result": {...} } if present.
-    - Returns a list of dicts.
+    Parse a single TTN Storage response line (NDJSON or SSE 'data: {...}').
 
-    Parameters
-    ----------
-    raw_text : str
-        Raw HTTP response text.
+    Unwraps a JSON wrapper { "result": {...} } if present.
 
     Returns
     -------
-    list[dict]
+    dict | None
+        The uplink object, or None for blank/unparseable lines.
     """
-    out = []
-    for ln in raw_text.splitlines():
-        s = ln.strip()
-        if not s:
-            continue
-        if s.startswith("data:"):
-            s = s[5:].strip()
-        if "{" in s and "}" in s:
-            s = s[s.find("{"): s.rfind("}")+1]
+    # Fast path: a plain NDJSON line is decoded as-is (no strip/prefix/slice work).
+    if ln[:1] == b"{":
         try:
-            o = json.loads(s)
+            return _unwrap_result(_json_loads(ln))
         except Exception:
-            continue
-        if isinstance(o, dict) and "result" in o and isinstance(o["result"], dict):
-            o = o["result"]
-        if isinstance(o, dict):
-            out.append(o)
-    return out
+            pass
+    s = ln.strip()
+    if not s:
+        return None
+    if s.startswith(b"data:"):
+        s = s[5:].strip()
+    if b"{" in s and b"}" in s:
+        s = s[s.find(b"{"): s.rfind(b"}")+1]
+    try:
+        return _unwrap_result(_json_loads(s))
+    except Exception:
+        return None
 
 def _best_ts(o: dict):
     """
@@ -266,16 +383,89 @@ def _best_ts(o: dict):
 RETRY_CODES = {429, 500, 502, 503, 504}
 MAX_RETRIES = int(os.environ.get("MAX_RETRIES", "5"))
 BACKOFF_BASE = float(os.environ.get("BACKOFF_BASE", "1.2"))
+# Shared request budget for all workers (requests/minute; 0 = no pacing, Retry-After still honored).
+TTN_RPM     = float(os.environ.get("TTN_RPM", "0"))
+TTN_RPM_MIN = float(os.environ.get("TTN_RPM_MIN", "6"))
+TTN_BURST   = max(1, int(os.environ.get("TTN_BURST", "1")))   # requests allowed back-to-back
+# Longest Retry-After we sleep for (seconds); a device asked to wait longer is skipped for this run.
+RETRY_AFTER_MAX = float(os.environ.get("RETRY_AFTER_MAX", "60"))
+
+class _TTNLimiter:
+    """
+    Process-wide request pacing for TTN (token bucket with AIMD on the allowed rate).
+
+    - acquire() admits up to `burst` requests at once, then one per 60/rpm seconds
+      across all threads, and waits out a server-imposed pause (Retry-After,
+      capped at RETRY_AFTER_MAX).
+    - report() adapts the rate: +0.5 rpm per success (up to `rpm_max`), halved
+      on 429/5xx (down to `rpm_min`).
+    With rpm_max <= 0 there is no pacing; only Retry-After pauses apply.
+    """
+
+    def __init__(self, rpm_max: float, rpm_min: float, burst: int = 1):
+        self.rpm_max = rpm_max
+        self.burst = burst
+        self.rpm_min = min(rpm_min, rpm_max) if rpm_max > 0 else 0.0
+        self.rpm = rpm_max
+        self._next = 0.0       # theoretical arrival time of the next request (GCRA form)
+        self._pause_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            t = max(now, self._pause_until)
+            if self.rpm > 0:
+                interval = 60.0 / self.rpm
+                tat = max(t, self._next)
+                t = max(t, tat - (self.burst - 1) * interval)
+                self._next = tat + interval
+        if t > now:
+            time.sleep(t - now)
+
+    def report(self, status: int, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            if status in RETRY_CODES:
+                if self.rpm > 0:
+                    self.rpm = max(self.rpm_min, self.rpm * 0.5)
+                if retry_after:
+                    self._pause_until = max(self._pause_until,
+                                            time.monotonic() + min(retry_after, RETRY_AFTER_MAX))
+            elif self.rpm > 0:
+                self.rpm = min(self.rpm_max, self.rpm + 0.5)
+
+LIMITER = _TTNLimiter(TTN_RPM, TTN_RPM_MIN, TTN_BURST)
+
+def _retry_after_seconds(resp) -> Optional[float]:
+    """Parse a Retry-After header (delta seconds or HTTP date); None if absent/invalid."""
+    v = resp.headers.get("Retry-After")
+    if not v:
+        return None
+    try:
+        return max(0.0, float(v))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(v) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
 
-def _do_get_with_retries(url, params, headers, timeout, dev):
+def _do_get_with_retries(url, params, headers, timeout, dev, stream=False):
     """
     HTTP GET with exponential backoff + jitter on 429/5xx/network errors.
 
+    Every attempt goes through LIMITER (shared pacing); a Retry-After header
+    replaces the exponential wait of that attempt. A Retry-After above
+    RETRY_AFTER_MAX is not slept: the error response is returned at once and
+    the caller stops pulling the device for this run (its stored history is kept).
+
     Parameters
     ----------
     url, params, headers, timeout : requests arguments
     dev : str
         Device id, only used for readable log messages.
+    stream : bool
+        If True, the body is not downloaded up front (use iter_lines/close).
 
     Returns
     -------
@@ -284,9 +474,18 @@ def _do_get_with_retries(url, params, headers, timeout, dev):
     last_exc = None
     for i in range(MAX_RETRIES):
         try:
-            resp = requests.get(url, headers=headers, params=params, timeout=timeout)
+            LIMITER.acquire()
+            resp = SESSION.get(url, headers=headers, params=params, timeout=timeout, stream=stream)
+            retry_after = _retry_after_seconds(resp) if resp.status_code in RETRY_CODES else None
+            LIMITER.report(resp.status_code, retry_after)
             if resp.status_code in RETRY_CODES:
-                wait = BACKOFF_BASE * (2 ** i) + random.uniform(0, JITTER_MAX_SECONDS)
+                if retry_after is not None and retry_after > RETRY_AFTER_MAX:
+                    print(f"[{dev}] GIVE UP HTTP {resp.status_code}: Retry-After {retry_after:.0f}s "
+                          f"exceeds RETRY_AFTER_MAX={RETRY_AFTER_MAX:.0f}s")
+                    return resp
+                resp.close()
+                wait = (retry_after if retry_after is not None else BACKOFF_BASE * (2 ** i)) \
+                       + random.uniform(0, JITTER_MAX_SECONDS)
                 print(f"[{dev}] RETRY {i+1}/{MAX_RETRIES} HTTP {resp.status_code} → wait {wait:.2f}s")
                 time.sleep(wait)
                 continue
@@ -300,7 +499,141 @@ def _do_get_with_retries(url, params, headers, timeout, dev):
         # If all retries failed, re-raise the last error for the caller to handle.
         raise last_exc
     # Fallback final attempt (defensive).
-    return requests.get(url, headers=headers, params=params, timeout=timeout)
+    LIMITER.acquire()
+    return SESSION.get(url, headers=headers, params=params, timeout=timeout, stream=stream)
+
+# Identity of one uplink (dedup key for merged histories).
+DEDUP_KEYS = ["device_id","received_at","f_port","payload_json"]
+
+def _append_unique(df_old: pd.DataFrame, df_new: pd.DataFrame) -> pd.DataFrame:
+    """
+    Append `df_new` to the persisted history `df_old`, dropping uplinks already present.
+
+    `df_old` was written de-duplicated, so only its rows inside the time window of
+    the new pull are compared (instead of re-hashing the whole history on every run).
+    f_port is compared as float64: persisted rows carry UInt8 (<NA>), fresh rows
+    float/object (NaN/None), and a missing port must match across both.
+    """
+    keys = [c for c in DEDUP_KEYS if c in df_old.columns and c in df_new.columns]
+    df_new = df_new.drop_duplicates(subset=keys)
+    if "received_at" in keys:
+        overlap = df_old[df_old["received_at"] >= df_new["received_at"].min()]
+    else:
+        overlap = df_old
+    if not overlap.empty:
+        def _keyed(d: pd.DataFrame) -> pd.DataFrame:
+            k = d[keys]
+            if "f_port" in keys:
+                k = k.assign(f_port=pd.to_numeric(k["f_port"], errors="coerce").astype("float64"))
+            return k.astype({"device_id": object}) if "device_id" in keys else k
+        both = pd.concat([_keyed(overlap), _keyed(df_new)], ignore_index=True)
+        df_new = df_new[~both.duplicated(subset=keys).to_numpy()[len(overlap):]]
+    return pd.concat([df_old, df_new], ignore_index=True)
+
+def _load_persisted(parq: Path, csv: Path) -> Tuple[pd.DataFrame, bool]:
+    """
+    Read a device's persisted history (parquet, falling back to csv).
+
+    Returns
+    -------
+    (DataFrame, bool)
+        The history with received_at as UTC datetimes (empty if unreadable or
+        missing), and whether it came from the parquet file. False means the
+        parquet is missing or corrupt and has to be rewritten.
+    """
+    parquet_ok = False
+    try:
+        if not parq.exists():
+            raise FileNotFoundError(parq)
+        df = pd.read_parquet(parq)
+        parquet_ok = True
+    except Exception:
+        try:
+            df = pd.read_csv(csv)
+        except Exception:
+            return pd.DataFrame(), False
+    if "received_at" in df.columns and not isinstance(df["received_at"].dtype, pd.DatetimeTZDtype):
+        df["received_at"] = pd.to_datetime(df["received_at"], utc=True, errors="coerce", format="ISO8601")
+    return df, parquet_ok
+
+def _parquet_max_ts(parq: Path) -> Optional[pd.Timestamp]:
+    """
+    Newest received_at of a parquet file from its row-group statistics (footer only).
+
+    Returns None if the column is not a timestamp or statistics are missing,
+    so callers can fall back to reading the column.
+    """
+    try:
+        pf = pq.ParquetFile(parq)
+        field = pf.schema_arrow.field("received_at")
+        if not str(field.type).startswith("timestamp"):
+            return None
+        col = pf.schema_arrow.get_field_index("received_at")
+        maxima = []
+        for i in range(pf.metadata.num_row_groups):
+            st = pf.metadata.row_group(i).column(col).statistics
+            if st is None or not st.has_min_max:
+                return None
+            maxima.append(pd.Timestamp(st.max))
+        if not maxima:
+            return None
+        ts = max(maxima)
+        return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    except Exception:
+        return None
+
+def _parquet_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Narrow dtypes for the parquet file (smaller file, faster reload); values are unchanged.
+
+    device_id → category, f_port → UInt8, rssi → Int16 (only if all values fit losslessly).
+    """
+    out = df.copy()
+    if "device_id" in out.columns:
+        out["device_id"] = out["device_id"].astype("category")
+    for col, dtype, lo, hi in (("f_port", "UInt8", 0, 255), ("rssi", "Int16", -32768, 32767)):
+        if col in out.columns and pd.api.types.is_numeric_dtype(out[col]):
+            v = out[col].dropna()
+            if v.empty or ((v % 1 == 0).all() and v.between(lo, hi).all()):
+                out[col] = out[col].astype(dtype)
+    return out
+
+def _open_raw_sinks(dev: str, raw: Path, stack: ExitStack) -> Tuple[list, List[Tuple[Path, Path, bool]]]:
+    """
+    Open temporary files for the raw NDJSON dump (and the optional timestamped snapshot).
+
+    Lines go to `<target>.part`; _commit_raw_sinks moves them into place once the
+    pull loop finished, so a failed pull never truncates the previous dump. Files
+    are registered on `stack`: they are closed and leftovers removed on any exit.
+
+    Returns
+    -------
+    (sinks, parts)
+        Open binary files, and (part, target, append) per file for the commit.
+    """
+    targets = [(raw, RAW_APPEND)]
+    if RAW_SNAPSHOT:
+        targets.append((DATA / f"{dev}_raw_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.ndjson", False))
+    sinks, parts = [], []
+    for target, append in targets:
+        part = target.with_name(target.name + ".part")
+        stack.callback(part.unlink, missing_ok=True)
+        sinks.append(stack.enter_context(part.open("wb")))
+        parts.append((part, target, append))
+    return sinks, parts
+
+def _commit_raw_sinks(sinks: list, parts: List[Tuple[Path, Path, bool]]) -> None:
+    """Close the temporary dumps and move them into place (RAW_APPEND: append to the dump)."""
+    for f in sinks:
+        f.close()
+    for part, target, append in parts:
+        if append:
+            with target.open("ab") as out, part.open("rb") as src:
+                out.write(b"\n")
+                shutil.copyfileobj(src, out)
+            part.unlink()
+        else:
+            os.replace(part, target)
 
 # ---------------- Pull per device ----------------
 def device_pull(dev: str) -> pd.DataFrame:
@@ -312,8 +645,8 @@ def device_pull(dev: str) -> pd.DataFrame:
     - OFFLINE: never calls HTTP; loads local Parquet/CSV if available.
     - ONLINE: calls /as/applications/<APP>/devices/<dev>/packages/storage/uplink_message
         * resume from last saved timestamp (if local data exists)
-        * robust parsing of NDJSON/SSE
-        * write raw NDJSON (append/snapshot optional)
+        * stream + parse NDJSON/SSE line by line (no full-body buffering)
+        * write raw NDJSON while streaming (append/snapshot optional)
         * merge & deduplicate into Parquet/CSV
 
     Returns
@@ -334,7 +667,7 @@ def device_pull(dev: str) -> pd.DataFrame:
             elif csv.exists():
                 df = pd.read_csv(csv)
                 if "received_at" in df.columns:
-                    df["received_at"] = pd.to_datetime(df["received_at"], utc=True, errors="coerce")
+                    df["received_at"] = pd.to_datetime(df["received_at"], utc=True, errors="coerce", format="ISO8601")
             else:
                 df = pd.DataFrame(columns=["device_id","received_at","f_port","rssi","snr","payload_json"])
             return df
@@ -354,139 +687,161 @@ def device_pull(dev: str) -> pd.DataFrame:
         used_after = False
 
         # Continue from the last local timestamp (prefer parquet, fallback to csv).
+        # Parquet footer statistics usually suffice; otherwise the history is loaded here.
+        df_old: Optional[pd.DataFrame] = None
+        parquet_ok = False   # history was read from an intact parquet (skipping a rewrite is safe)
         if parq.exists() or csv.exists():
-            df_old_ts = None
-            try:
-                if parq.exists():
-                    df_old_ts = pd.read_parquet(parq)
-                else:
-                    raise FileNotFoundError
-            except Exception:
-                try:
-                    df_old_ts = pd.read_csv(csv)
-                    if "received_at" in df_old_ts.columns:
-                        df_old_ts["received_at"] = pd.to_datetime(df_old_ts["received_at"], utc=True, errors="coerce")
-                except Exception:
-                    df_old_ts = None
-            if df_old_ts is not None and not df_old_ts.empty:
-                last_old = pd.to_datetime(df_old_ts["received_at"], utc=True, errors="coerce").max()
-                if pd.notna(last_old):
-                    current_after = max(current_after, last_old + pd.Timedelta(seconds=1))
-                    used_after = True
-
-        all_rows: List[Dict] = []
-        ndjson_chunks: List[str] = []
-
-        # Pull loop, with 400 fallbacks (reduce limit, try without 'after').
-        while True:
-            params = {"limit": str(limit_primary)}
-            if used_after:
-                params["after"] = current_after.replace(microsecond=0).strftime("%Y-%m-%dT%H:%M:%SZ")
-
-            r = _do_get_with_retries(url, params, HDRS, 30, dev)
-
-            if r.status_code == 400:
-                body = (r.text or "").strip()
-                print(f"[{dev}] WARN HTTP 400 for params={params} - BODY: {body[:180]}")
-                params_fb = dict(params); params_fb["limit"] = str(limit_fallback)
-                r2 = _do_get_with_retries(url, params_fb, HDRS, 30, dev)
-                if not r2.ok or not r2.text.strip():
-                    params_no_after = {"limit": str(limit_fallback)}
-                    r3 = _do_get_with_retries(url, params_no_after, HDRS, 30, dev)
-                    r = r3; used_after = False
-                else:
-                    r = r2
-
-            if r.status_code == 204 or not r.text.strip():
-                break
-            if not r.ok:
-                print(f"[{dev}] ERROR HTTP {r.status_code} {r.reason} for {r.url}")
-                return _empty_df()
-
-            raw_text = r.text
-            ndjson_chunks.append(raw_text)
-
-            objs = _robust_json_lines(raw_text)
-            if not objs:
-                break
-
-            batch_rows, max_ts = [], None
-            for o in objs:
-                up  = o.get("uplink_message", {}) if isinstance(o, dict) else {}
-                rx0 = (up.get("rx_metadata") or [{}]); rx0 = rx0[0] if isinstance(rx0, list) and rx0 else {}
-                ts  = _best_ts(o)
-                batch_rows.append({
-                    "received_at": ts,
-                    "device_id":   dev,
-                    "f_port":      up.get("f_port"),
-                    "rssi":        rx0.get("rssi"),
-                    "snr":         rx0.get("snr"),
-                    "payload_json": json.dumps(up.get("decoded_payload", {}), ensure_ascii=False),
-                })
-                if ts:
-                    tsv = pd.to_datetime(ts, utc=True, errors="coerce")
-                    if pd.notna(tsv):
-                        max_ts = tsv if max_ts is None or tsv > max_ts else max_ts
-
-            all_rows.extend(batch_rows)
-
-            # Stop when TTN returned fewer rows than limit or we couldn't compute a max timestamp.
-            eff_limit = int((params.get("limit") or limit_primary))
-            if len(objs) < eff_limit or max_ts is None:
-                break
-            current_after = max_ts + pd.Timedelta(seconds=1)
-            used_after = True
-
-        # Write raw NDJSON for debugging (append or snapshot as configured).
-        if ndjson_chunks:
-            mode = "a" if RAW_APPEND else "w"
-            with raw.open(mode, encoding="utf-8") as f:
-                if mode == "a":
-                    f.write("\n")
-                f.write("".join(ndjson_chunks))
-            if RAW_SNAPSHOT:
-                snap = DATA / f"{dev}_raw_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.ndjson"
-                snap.write_text("".join(ndjson_chunks), encoding="utf-8")
-
-        # Build dataframe for new rows.
-        df_new = pd.DataFrame(all_rows)
+            last_old = _parquet_max_ts(parq) if parq.exists() else None
+            if last_old is None:
+                # No usable footer statistics (or CSV only): load once, reused for the merge.
+                df_old, parquet_ok = _load_persisted(parq, csv)
+                if "received_at" in df_old.columns and not df_old.empty:
+                    last_old = df_old["received_at"].max()
+            if last_old is not None and pd.notna(last_old):
+                current_after = max(current_after, last_old + pd.Timedelta(seconds=1))
+                used_after = True
+
+        # Column buffers for new rows (filled page by page, turned into a frame once).
+        ts_l: List = []; port_l: List = []; rssi_l: List = []; snr_l: List = []; pj_l: List[str] = []
+        ts_pages: List[pd.Series] = []   # parsed received_at per page (reused for df_new)
+
+        # Raw NDJSON sinks are opened on the first received line; they are committed
+        # only after the pull loop completed and discarded on any early exit.
+        with ExitStack() as raw_stack:
+            raw_sinks: list = []; raw_parts: list = []
+
+            # Pull loop, with 400 fallbacks (reduce limit, try without 'after').
+            while True:
+                params = {"limit": str(limit_primary)}
+                if FIELD_MASK:
+                    params["field_mask"] = FIELD_MASK
+                if used_after:
+                    params["after"] = current_after.replace(microsecond=0).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+                r = _do_get_with_retries(url, params, HDRS, 30, dev, stream=True)
+
+                if r.status_code == 400:
+                    body = (r.text or "").strip()
+                    print(f"[{dev}] WARN HTTP 400 for params={params} - BODY: {body[:180]}")
+                    params_fb = dict(params); params_fb["limit"] = str(limit_fallback)
+                    r2 = _do_get_with_retries(url, params_fb, HDRS, 30, dev, stream=True)
+                    if not r2.ok or not r2.text.strip():
+                        params_no_after = {k: v for k, v in params_fb.items() if k != "after"}
+                        r3 = _do_get_with_retries(url, params_no_after, HDRS, 30, dev, stream=True)
+                        r = r3; used_after = False
+                    else:
+                        r = r2
+
+                if r.status_code == 204:
+                    break
+                if not r.ok:
+                    if r.status_code in RETRY_CODES:
+                        # Rate limit / server error after retries (or GIVE UP): stop paging and
+                        # merge what we have, so the stored history still reaches the dashboard.
+                        r.close()
+                        print(f"[{dev}] WARN HTTP {r.status_code}: pull stopped, keeping stored history")
+                        break
+                    if not r.content.strip():
+                        break
+                    print(f"[{dev}] ERROR HTTP {r.status_code} {r.reason} for {r.url}")
+                    return _empty_df()
+
+                # Parse each line as it arrives, mirror it into the raw dump and extract
+                # the row fields right away (no per-page list of uplink dicts).
+                page_start = len(ts_l)
+                with r:
+                    for line in r.iter_lines(chunk_size=65536):
+                        if not line:
+                            continue
+                        if not raw_sinks:
+                            raw_sinks, raw_parts = _open_raw_sinks(dev, raw, raw_stack)
+                        for f in raw_sinks:
+                            f.write(line + b"\n")
+                        o = _parse_json_line(line)
+                        if o is None:
+                            continue
+                        up  = o.get("uplink_message", {})
+                        rx0 = (up.get("rx_metadata") or [{}]); rx0 = rx0[0] if isinstance(rx0, list) and rx0 else {}
+                        ts_l.append(_best_ts(o))
+                        port_l.append(up.get("f_port"))
+                        rssi_l.append(rx0.get("rssi"))
+                        snr_l.append(rx0.get("snr"))
+                        # stdlib dumps on purpose: payload_json is part of the dedup key, so its
+                        # text format ("a": 1, ...) must stay identical to already persisted rows.
+                        pj_l.append(json.dumps(up.get("decoded_payload", {}), ensure_ascii=False))
+                n_page = len(ts_l) - page_start
+                if not n_page:
+                    break
+
+                # Newest timestamp of this page (one vectorized parse instead of one per uplink).
+                page_ts = pd.to_datetime(pd.Series(ts_l[page_start:], dtype=object), utc=True,
+                                         errors="coerce", format="ISO8601")
+                ts_pages.append(page_ts)
+                max_ts = page_ts.max()
+                if pd.isna(max_ts):
+                    max_ts = None
+
+                # Stop when TTN returned fewer rows than limit or we couldn't compute a max timestamp.
+                eff_limit = int((params.get("limit") or limit_primary))
+                if n_page < eff_limit or max_ts is None:
+                    break
+                current_after = max_ts + pd.Timedelta(seconds=1)
+                used_after = True
+
+            if raw_sinks:
+                _commit_raw_sinks(raw_sinks, raw_parts)
+
+        # Build dataframe for new rows (one column-oriented construction, no per-row dicts);
+        # received_at reuses the per-page parses instead of parsing every string again.
+        df_new = pd.DataFrame({
+            "received_at":  pd.concat(ts_pages, ignore_index=True) if ts_pages else ts_l,
+            "device_id":    dev,
+            "f_port":       port_l,
+            "rssi":         rssi_l,
+            "snr":          snr_l,
+            "payload_json": pj_l,
+        })
         if not df_new.empty:
-            df_new["received_at"] = pd.to_datetime(df_new["received_at"], utc=True, errors="coerce")
             df_new = df_new.dropna(subset=["received_at"]).sort_values("received_at")
 
         # Merge with existing local data (prefer parquet, fallback to csv).
         if parq.exists() or csv.exists():
-            try:
-                if parq.exists():
-                    df_old = pd.read_parquet(parq)
-                else:
-                    raise FileNotFoundError
-            except Exception:
-                try:
-                    df_old = pd.read_csv(csv)
-                    if "received_at" in df_old.columns:
-                        df_old["received_at"] = pd.to_datetime(df_old["received_at"], utc=True, errors="coerce")
-                except Exception:
-                    df_old = pd.DataFrame()
+            if df_old is None:
+                df_old, parquet_ok = _load_persisted(parq, csv)
+            if df_new.empty and parquet_ok and not df_old.empty:
+                # Nothing new to append: the persisted history is already merged and
+                # de-duplicated, so skip the full rewrite of parquet/csv.
+                print(f"[{dev}] no new rows, skipping write")
+                return df_old
             if not df_old.empty and not df_new.empty:
-                df = pd.concat([df_old, df_new], ignore_index=True)
+                df = _append_unique(df_old, df_new)
+                if len(df) == len(df_old) and parquet_ok:
+                    # Every pulled uplink was already persisted (overlapping window).
+                    print(f"[{dev}] no new rows (all {len(df_new)} pulled already stored), skipping write")
+                    return df_old
             else:
-                df = df_old if df_new.empty else df_new
+                df = df_old if df_new.empty else df_new.drop_duplicates(subset=DEDUP_KEYS)
         else:
-            df = df_new
+            df = df_new.drop_duplicates(subset=DEDUP_KEYS)
 
-        # Deduplicate and persist (both parquet and csv; parquet may fail on some environments).
+        # Persist (parquet, plus the csv mirror unless WRITE_CSV=0; parquet may fail on some environments).
         if not df.empty:
-            subset_cols = [c for c in ["device_id","received_at","f_port","payload_json"] if c in df.columns]
-            df = df.drop_duplicates(subset=subset_cols).sort_values("received_at")
+            # History and new rows are each sorted; a plain append stays in order, so
+            # only late-arriving uplinks (older than the history's tail) force a full sort.
+            if not df["received_at"].is_monotonic_increasing:
+                df = df.sort_values("received_at")
             try:
-                df.to_parquet(parq, index=False)
+                # Bounded row groups with column statistics: _parquet_max_ts reads the
+                # resume cursor from them without touching column data.
+                _parquet_dtypes(df).to_parquet(parq, index=False, compression="zstd", compression_level=3,
+                                               row_group_size=65536, write_statistics=True)
             except Exception as e:
                 print(f"[{dev}] WARN: parquet write failed: {e}")
-            try:
-                df.to_csv(csv, index=False)
-            except Exception as e:
-                print(f"[{dev}] WARN: csv write failed: {e}")
+            if WRITE_CSV:
+                try:
+                    df.to_csv(csv, index=False)
+                except Exception as e:
+                    print(f"[{dev}] WARN: csv write failed: {e}")
             return df
 
         return _empty_df()
@@ -496,23 +851,110 @@ def device_pull(dev: str) -> pd.DataFrame:
         return pd.DataFrame(columns=["device_id","received_at","f_port","rssi","snr","payload_json"])
 
 # ---------------- Flatten & Normalize ----------------
+def _flatten_into(d: dict, prefix: str, out: dict) -> None:
+    """
+    Recursively flatten nested dicts into `out` (a.b → a_b).
+
+    Column order matches pd.json_normalize: top-level scalars first, then the
+    expanded nested dicts (depth-first below the top level).
+    """
+    nested = []
+    for k, v in d.items():
+        key = f"{prefix}_{k}" if prefix else str(k)
+        if not isinstance(v, dict):
+            out[key] = v
+        elif prefix:
+            _flatten_into(v, key, out)
+        else:
+            nested.append((key, v))
+    for key, v in nested:
+        _flatten_into(v, key, out)
+
+def _with_columns(df: pd.DataFrame, extra: dict) -> pd.DataFrame:
+    """
+    Return `df` (index reset) plus the row-aligned arrays/lists in `extra`.
+
+    Columns that already exist in `df` win; the result is built in one construction
+    instead of gluing frames together with pd.concat(axis=1). Existing columns are
+    shared, not copied (copy-on-write keeps `df` itself unaffected by later edits).
+    """
+    df = df.reset_index(drop=True)
+    data = {c: df[c] for c in df.columns}
+    for c, v in extra.items():
+        data.setdefault(c, v)
+    return pd.DataFrame(data, index=df.index, copy=False)
+
 def flatten_payload(df: pd.DataFrame) -> pd.DataFrame:
     """
     Convert 'payload_json' strings to dicts and flatten into columns.
 
     - Dots in nested keys are replaced by underscores (a.b → a_b).
     - Existing columns are preserved; duplicates from the flat view are dropped.
+    - Single pass: values are collected straight into per-column lists
+      (no pd.json_normalize, no per-row Series).
     """
     if df.empty or "payload_json" not in df.columns:
         return df
-    dicts = df["payload_json"].apply(lambda s: json.loads(s) if isinstance(s, str) and s else {})
-    if dicts.map(bool).any():
-        flat = pd.json_normalize(dicts).rename(columns=lambda c: c.replace(".", "_"))
-        dup = [c for c in flat.columns if c in df.columns]
-        flat.drop(columns=dup, inplace=True, errors="ignore")
-        df = pd.concat([df.reset_index(drop=True), flat.reset_index(drop=True)], axis=1)
+    n = len(df)
+    cols: Dict[str, list] = defaultdict(lambda: [None] * n)
+    row: dict = {}
+    for i, s in enumerate(df["payload_json"].to_numpy()):
+        d = _json_loads(s) if isinstance(s, str) and s else {}
+        if not isinstance(d, dict) or not d:
+            continue
+        if any(isinstance(v, dict) for v in d.values()):
+            row.clear()
+            _flatten_into(d, "", row)
+            d = row
+        # Shallow payloads (DDS75/PS-LB) go straight into the columns, no recursion.
+        for k, v in d.items():
+            cols[k][i] = v
+    if cols:
+        extra: Dict[str, list] = {}
+        for k, v in cols.items():
+            extra.setdefault(k.replace(".", "_"), v)
+        df = _with_columns(df, extra)
     return df
 
+# Derived numeric columns per device family:
+#   target → (source candidates in order of preference, divisor applied after casting)
+DDS75_FIELDS = {
+    "battery":        (("Bat", "BAT", "Bat_V"), 1.0),
+    "distance_cm":    (("Distance_mm", "Distance"), 10.0),   # mm → cm
+    "temperature":    (("TempC_DS18B20",), 1.0),
+    "interrupt_flag": (("Interrupt_flag",), 1.0),
+    "sensor_flag":    (("Sensor_flag",), 1.0),
+}
+PSLB_FIELDS = {
+    "battery":          (("Bat_V", "BAT"), 1.0),
+    "water_cm":         (("Water_deep_cm",), 1.0),
+    "pressure_kpa":     (("Water_pressure_kPa",), 1.0),
+    "pressure_mpa":     (("Water_pressure_MPa",), 1.0),
+    "diff_pressure_pa": (("Differential_pressure_Pa",), 1.0),
+    "vdc_input_v":      (("VDC_intput_V",), 1.0),
+    "idc_input_ma":     (("IDC_intput_mA",), 1.0),
+    "probe_mode":       (("Probe_mod",), 1.0),
+}
+
+def _derive_numeric(df: pd.DataFrame, fields: Dict[str, Tuple[Tuple[str, ...], float]]) -> pd.DataFrame:
+    """
+    Add numeric target columns from the first present source column of `fields`.
+
+    Targets that already exist are left untouched. All sources are cast in one
+    pd.to_numeric pass and the new columns are attached in a single assign.
+    """
+    plan = {}
+    for dst, (srcs, div) in fields.items():
+        if dst in df.columns:
+            continue
+        src = next((c for c in srcs if c in df.columns), None)
+        if src is not None:
+            plan[dst] = (src, div)
+    if not plan:
+        return df
+    num = df[list(dict.fromkeys(src for src, _ in plan.values()))].apply(pd.to_numeric, errors="coerce")
+    return df.assign(**{dst: (num[src] / div if div != 1.0 else num[src]) for dst, (src, div) in plan.items()})
+
 def normalize_dds75(df: pd.DataFrame) -> pd.DataFrame:
     """
     Normalize fields common to DDS75-LB sensors:
@@ -521,21 +963,7 @@ def normalize_dds75(df: pd.DataFrame) -> pd.DataFrame:
     - temperature ← TempC_DS18B20
     - flag fields renamed to snake_case
     """
-    if "battery" not in df.columns:
-        for src in ("Bat","BAT","Bat_V"):
-            if src in df.columns:
-                df["battery"] = pd.to_numeric(df[src], errors="coerce"); break
-    if "distance_cm" not in df.columns:
-        if "Distance_mm" in df.columns:
-            df["distance_cm"] = pd.to_numeric(df["Distance_mm"], errors="coerce") / 10.0
-        elif "Distance" in df.columns:
-            df["distance_cm"] = pd.to_numeric(df["Distance"], errors="coerce") / 10.0
-    if "temperature" not in df.columns and "TempC_DS18B20" in df.columns:
-        df["temperature"] = pd.to_numeric(df["TempC_DS18B20"], errors="coerce")
-    for src, dst in [("Interrupt_flag","interrupt_flag"), ("Sensor_flag","sensor_flag")]:
-        if src in df.columns and dst not in df.columns:
-            df[dst] = pd.to_numeric(df[src], errors="coerce")
-    return df
+    return _derive_numeric(df, DDS75_FIELDS)
 
 def normalize_pslb(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -545,76 +973,79 @@ def normalize_pslb(df: pd.DataFrame) -> pd.DataFrame:
     - vdc_input_v / idc_input_ma
     - probe_mode / digital inputs (normalized to lowercase field names)
     """
-    for src in ("Bat_V", "BAT"):
-        if src in df.columns and "battery" not in df.columns:
-            df["battery"] = pd.to_numeric(df[src], errors="coerce")
-    mapping = {
-        "Water_deep_cm": "water_cm",
-        "Water_pressure_kPa": "pressure_kpa",
-        "Water_pressure_MPa": "pressure_mpa",
-        "Differential_pressure_Pa": "diff_pressure_pa",
-        "VDC_intput_V": "vdc_input_v",
-        "IDC_intput_mA": "idc_input_ma",
-        "Probe_mod": "probe_mode",
-    }
-    for src, dst in mapping.items():
-        if src in df.columns and dst not in df.columns:
-            df[dst] = pd.to_numeric(df[src], errors="coerce")
-    for s in ("IN1_pin_level","IN2_pin_level","Exti_pin_level","Exti_status"):
-        if s in df.columns and s.lower() not in df.columns:
-            df[s.lower()] = df[s]
-    return df
+    df = _derive_numeric(df, PSLB_FIELDS)
+    levels = {s.lower(): df[s] for s in ("IN1_pin_level","IN2_pin_level","Exti_pin_level","Exti_status")
+              if s in df.columns and s.lower() not in df.columns}
+    return df.assign(**levels) if levels else df
+
+# SenseCAP measurement type → normalized column (also the output column order).
+SENSECAP_TYPES = {
+    "Air Temperature":       "temperature",
+    "Air Humidity":          "humidity",
+    "Light Intensity":       "illumination",
+    "UV Index":              "uv_index",
+    "Wind Speed":            "wind_speed",
+    "Wind Direction Sensor": "wind_dir",
+    "Rain Gauge":            "rainfall",
+    "Barometric Pressure":   "pressure_hpa",
+}
 
 def normalize_sensecap_messages(df: pd.DataFrame) -> pd.DataFrame:
     """
     Extract SenseCAP 'messages' into flat columns:
     temperature, humidity, illumination, uv_index, wind_speed, wind_dir,
     rainfall, pressure_hpa (auto-scaled if value seems to be in Pa).
+
+    Reuses the 'messages' column produced by flatten_payload (falls back to
+    parsing 'payload_json'), collects all readings into one long frame and
+    pivots it to wide columns (no per-row dicts or Series).
     """
-    if df.empty or "payload_json" not in df.columns:
+    if df.empty:
         return df
-    def extract(s):
-        try:
-            o = json.loads(s) if isinstance(s, str) else {}
-        except Exception:
-            return {}
-        msgs = o.get("messages") or []
-        flat_msgs = []
-        for m in msgs:
-            if isinstance(m, list): flat_msgs.extend(m)
-            elif isinstance(m, dict): flat_msgs.append(m)
-        by_type = {}
-        for m in flat_msgs:
-            t = m.get("type"); v = m.get("measurementValue")
-            if t is None:
-                continue
-            try:
-                v = float(v)
-            except Exception:
-                pass
-            by_type[t] = v
-        res = {}
-        if "Air Temperature" in by_type:  res["temperature"]  = by_type["Air Temperature"]
-        if "Air Humidity" in by_type:     res["humidity"]     = by_type["Air Humidity"]
-        if "Light Intensity" in by_type:  res["illumination"] = by_type["Light Intensity"]
-        if "UV Index" in by_type:         res["uv_index"]     = by_type["UV Index"]
-        if "Wind Speed" in by_type:       res["wind_speed"]   = by_type["Wind Speed"]
-        if "Wind Direction Sensor" in by_type: res["wind_dir"] = by_type["Wind Direction Sensor"]
-        if "Rain Gauge" in by_type:       res["rainfall"]     = by_type["Rain Gauge"]
-        if "Barometric Pressure" in by_type:
-            p = by_type["Barometric Pressure"]
+    if "messages" in df.columns:
+        msgs_col = df["messages"].to_numpy()
+    elif "payload_json" in df.columns:
+        msgs_col = []
+        for s in df["payload_json"].to_numpy():
             try:
-                p = float(p)
-                res["pressure_hpa"] = p/100.0 if p > 5000 else p
+                o = _json_loads(s) if isinstance(s, str) else {}
             except Exception:
-                pass
-        return res
-    metrics = df["payload_json"].apply(extract).apply(pd.Series)
-    if metrics is not None and not metrics.empty:
-        dup = [c for c in metrics.columns if c in df.columns]
-        metrics.drop(columns=dup, inplace=True, errors="ignore")
-        df = pd.concat([df.reset_index(drop=True), metrics.reset_index(drop=True)], axis=1)
-    return df
+                o = {}
+            msgs_col.append(o.get("messages") if isinstance(o, dict) else None)
+    else:
+        return df
+
+    # Long format: one (row, column, value) triple per known measurement.
+    rows, keys, vals = [], [], []
+    for i, msgs in enumerate(msgs_col):
+        if not isinstance(msgs, list):
+            continue
+        for m in msgs:
+            for mm in (m if isinstance(m, list) else (m,)):
+                if isinstance(mm, dict):
+                    key = SENSECAP_TYPES.get(mm.get("type"))
+                    if key is not None:
+                        rows.append(i); keys.append(key); vals.append(mm.get("measurementValue"))
+    if not rows:
+        return df
+
+    long = pd.DataFrame({"row": rows, "key": keys, "val": vals}).drop_duplicates(["row", "key"], keep="last")
+    num = pd.to_numeric(long["val"], errors="coerce")
+    non_numeric = num.isna() & long["val"].notna()
+    metrics = long.assign(val=num).pivot(index="row", columns="key", values="val")
+    # Keep non-numeric readings as-is (object column) instead of dropping them.
+    for key in long.loc[non_numeric & (long["key"] != "pressure_hpa"), "key"].unique():
+        col = metrics[key].astype(object)
+        col.update(long[non_numeric & (long["key"] == key)].set_index("row")["val"])
+        metrics[key] = col
+    if "pressure_hpa" in metrics.columns:
+        p = metrics["pressure_hpa"]
+        metrics["pressure_hpa"] = p.where(~(p > 5000), p / 100.0)
+    metrics = metrics[[c for c in SENSECAP_TYPES.values() if c in metrics.columns]]
+    metrics = metrics.reindex(range(len(df)))
+    metrics.columns.name = None
+
+    return _with_columns(df, {c: metrics[c].to_numpy() for c in metrics.columns})
 
 def normalize_all(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -628,9 +1059,9 @@ def normalize_all(df: pd.DataFrame) -> pd.DataFrame:
     df = normalize_dds75(df)
     df = normalize_pslb(df)
     df = normalize_sensecap_messages(df)
-    for col in ("rssi","snr"):
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
+    radio = [c for c in ("rssi","snr") if c in df.columns]
+    if radio:
+        df[radio] = df[radio].apply(pd.to_numeric, errors="coerce")
     return df
 
 # ---------------- Type detection & Plot helpers ----------------
@@ -641,23 +1072,103 @@ def detect_sensor_type(df: pd.DataFrame, device_id: str) -> str:
     Prefers explicit fields like 'node_type' or 'sensor_model', otherwise
     infers from device name or from characteristic columns.
     """
+    cols = df.columns   # Index membership is a hash lookup; no per-call set needed
     for col in ("node_type", "Node_type", "sensor_model", "SENSOR_MODEL"):
-        if col in df.columns:
-            vser = df[col].dropna()
-            if not vser.empty:
-                v = str(vser.iloc[-1])
+        if col in cols:
+            # Last non-null value without materializing a dropna() copy of the column.
+            pos = df[col].notna().to_numpy().nonzero()[0]
+            if len(pos):
+                v = str(df[col].iat[pos[-1]])
                 if v:
                     return v
     name = device_id.lower()
-    cols = set(df.columns)
-    if "sensecap" in name or {"illumination","uv_index","wind_speed","pressure_hpa"} & cols:
+    if "sensecap" in name or any(c in cols for c in ("illumination","uv_index","wind_speed","pressure_hpa")):
         return "SenseCAP"
-    if "dds75" in name or {"distance_cm","TempC_DS18B20","Interrupt_flag"} & cols:
+    if "dds75" in name or any(c in cols for c in ("distance_cm","TempC_DS18B20","Interrupt_flag")):
         return "DDS75-LB"
-    if "ps-lb" in name or {"water_cm","idc_input_ma","vdc_input_v"} & cols:
+    if "ps-lb" in name or any(c in cols for c in ("water_cm","idc_input_ma","vdc_input_v")):
         return "PS-LB"
     return "Other"
 
+# {{KEY}} placeholders of the dashboard template.
+_TPL_RE = re.compile(r"{{\s*([A-Z0-9_]+)\s*}}")
+
+# plotly.js is loaded once per page ({{PLOTLY_JS}} in the template), not per chart.
+PLOTLY_JS_TAG = (
+    "<script>window.PlotlyConfig = {MathJaxConfig: 'local'};</script>"
+    f'<script charset="utf-8" src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"></script>'
+)
+
+def _lttb_index(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of `n_out` points that keep the visual shape.
+
+    `x` must be sorted ascending; first and last point are always kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # Average of the next bucket (or the last point) as the third triangle corner.
+        nlo, nhi = hi, (edges[b + 2] if b + 2 < len(edges) else n)
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        out[b + 1] = a
+    return out
+
+def _downsample(d: pd.DataFrame, y: str) -> pd.DataFrame:
+    """Reduce `d` (received_at + y, no NaN) to at most MAX_PLOT_POINTS rows via LTTB."""
+    if MAX_PLOT_POINTS <= 0 or len(d) <= MAX_PLOT_POINTS:
+        return d
+    d = d.sort_values("received_at")
+    x = d["received_at"].to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(float)
+    return d.iloc[_lttb_index(x, d[y].to_numpy(dtype=float), MAX_PLOT_POINTS)]
+
+# Shared look of all charts.
+PLOT_LAYOUT = dict(
+    template="plotly_white", paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
+    margin=dict(l=10, r=10, t=40, b=10), font=dict(size=14),
+    xaxis=dict(showgrid=True, zeroline=False), yaxis=dict(showgrid=True, zeroline=False)
+)
+_PLOT_SHELLS: Dict[str, dict] = {}
+
+def _plot_shell(kind: str) -> dict:
+    """
+    Validated figure skeleton ('line' or 'multi') as a plain dict, built once per run.
+
+    Building/validating a plotly Figure (mostly the template) dominates chart cost,
+    so per chart only data and titles are swapped into a copy of this skeleton.
+    """
+    if kind not in _PLOT_SHELLS:
+        if kind == "line":
+            fig = px.line(pd.DataFrame({"received_at": [], "y": []}), x="received_at", y="y")
+            fig.update_layout(**PLOT_LAYOUT)
+        else:
+            fig = go.Figure(go.Scatter(mode="lines"))
+            fig.update_layout(**PLOT_LAYOUT, legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0))
+        _PLOT_SHELLS[kind] = fig.to_plotly_json()
+    return _PLOT_SHELLS[kind]
+
+def _figure_html(data: List[dict], layout: dict) -> str:
+    """
+    Serialize traces + shell layout to an HTML snippet (plotly.js is loaded once per page).
+
+    Only the traces go through plotly's validation (array coercion/encoding); the
+    already validated template is put back into the plain dict afterwards.
+    """
+    fig = go.Figure(data=data, layout=dict(layout, template={})).to_dict()
+    fig["layout"] = {"template": layout["template"],
+                     **{k: v for k, v in fig["layout"].items() if k != "template"}}
+    # Note: do not set cliponaxis here; ScatterGL doesn't support it.
+    return pio.to_html(fig, validate=False, include_plotlyjs=False,
+                       full_html=False, default_width="100%", default_height="350px")
+
 def to_plot_html(df: pd.DataFrame, y: str, title: str) -> Optional[str]:
     """
     Build a single-metric time-series Plotly figure and return it as HTML (no full page).
@@ -672,15 +1183,13 @@ def to_plot_html(df: pd.DataFrame, y: str, title: str) -> Optional[str]:
     d = df[["received_at", y]].dropna()
     if d.empty:
         return None
-    fig = px.line(d, x="received_at", y=y, title=title)
-    fig.update_layout(
-        template="plotly_white", paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
-        margin=dict(l=10, r=10, t=40, b=10), font=dict(size=14),
-        xaxis=dict(showgrid=True, zeroline=False), yaxis=dict(showgrid=True, zeroline=False)
-    )
-    # Note: do not set cliponaxis here; ScatterGL doesn't support it.
-    return pio.to_html(fig, include_plotlyjs="cdn", full_html=False,
-                       default_width="100%", default_height="350px")
+    d = _downsample(d, y)
+    shell = _plot_shell("line")
+    trace = dict(shell["data"][0], x=d["received_at"], y=d[y],
+                 hovertemplate=f"received_at=%{{x}}<br>{y}=%{{y}}<extra></extra>")
+    layout = dict(shell["layout"], title={"text": title},
+                  yaxis=dict(shell["layout"]["yaxis"], title={"text": y}))
+    return _figure_html([trace], layout)
 
 def to_plot_multi_html(df: pd.DataFrame, y_cols: List[str], title: str) -> Optional[str]:
     """
@@ -698,18 +1207,49 @@ def to_plot_multi_html(df: pd.DataFrame, y_cols: List[str], title: str) -> Optio
     if d.empty:
         return None
     d = d.sort_values("received_at")
-    fig = go.Figure()
+    shell = _plot_shell("multi")
+    traces = []
+    too_long = 0 < MAX_PLOT_POINTS < len(d)
     for c in y_cols:
-        fig.add_trace(go.Scatter(x=d["received_at"], y=d[c], mode="lines", name=c))
-    fig.update_layout(
-        template="plotly_white", paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
-        margin=dict(l=10, r=10, t=40, b=10), font=dict(size=14),
-        xaxis=dict(showgrid=True, zeroline=False), yaxis=dict(showgrid=True, zeroline=False),
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="left", x=0)
-    )
-    # Note: do not set cliponaxis here; ScatterGL doesn't support it.
-    return pio.to_html(fig, include_plotlyjs="cdn", full_html=False,
-                       default_width="100%", default_height="350px")
+        dc = _downsample(d[["received_at", c]].dropna(), c) if too_long else d
+        traces.append(dict(shell["data"][0], x=dc["received_at"], y=dc[c], name=c))
+    return _figure_html(traces, shell["layout"])
+
+def _plot_cache_key(df: pd.DataFrame, typ: str) -> Optional[str]:
+    """
+    Cache key for a device's chart tile: row count + received_at span of the frame being
+    plotted + render settings + script version (PLOT_RENDER_VERSION, so code changes
+    invalidate all tiles).
+
+    Keyed on the rendered frame, not data/<dev>.parquet: if the parquet write failed,
+    the new rows are still plotted instead of serving the tile of the old file.
+    None if caching is off.
+    """
+    if not PLOT_CACHE_DIR:
+        return None
+    ts = df["received_at"]
+    return (f"{len(df)}:{ts.min()}:{ts.max()}:{typ}:{MAX_PLOT_POINTS}:"
+            f"{get_plotlyjs_version()}:{PLOT_RENDER_VERSION}")
+
+def _plot_cache_get(dev: str, key: Optional[str]) -> Optional[str]:
+    """Return the cached tile HTML for `dev` if it was rendered under the same key."""
+    if key is None:
+        return None
+    try:
+        head, _, body = (Path(PLOT_CACHE_DIR) / f"{dev}.html").read_text(encoding="utf-8").partition("\n")
+    except OSError:
+        return None
+    return body if head == f"<!-- {key} -->" else None
+
+def _plot_cache_put(dev: str, key: Optional[str], tile_html: str) -> None:
+    """Store a freshly rendered tile (best effort; cache failures never break the build)."""
+    if key is None:
+        return
+    try:
+        cache = Path(PLOT_CACHE_DIR); cache.mkdir(parents=True, exist_ok=True)
+        (cache / f"{dev}.html").write_bytes(f"<!-- {key} -->\n{tile_html}".encode("utf-8"))
+    except OSError as e:
+        print(f"[{dev}] WARN: plot cache write failed: {e}")
 
 # Preferred plot order per detected type.
 PREFERRED_BY_TYPE = {
@@ -720,6 +1260,18 @@ PREFERRED_BY_TYPE = {
 }
 
 # Content vs. 'operability' fields
+def _numeric_cols(df: pd.DataFrame) -> List[str]:
+    """
+    Numeric (incl. boolean) columns of `df` in column order.
+
+    The main loop stores the list in df.attrs once per device after normalization;
+    value cards, debug tables and charts share it instead of re-inspecting dtypes.
+    """
+    cols = df.attrs.get("numeric_cols")
+    if cols is None:
+        cols = df.select_dtypes(include=["number", "bool", "boolean"]).columns.tolist()
+    return cols
+
 NON_CONTENT = {"battery","rssi","snr","vdc_input_v","idc_input_ma","probe_mode","interrupt_flag","sensor_flag","f_port"}
 CONTENT_BY_TYPE = {
     "DDS75-LB": ["distance_cm","temperature"],
@@ -759,6 +1311,26 @@ def _fmt_val(key: str, v) -> Optional[str]:
     except Exception:
         return str(v)
 
+def _html_table(df: pd.DataFrame, escape: bool = True) -> str:
+    """
+    Render a small DataFrame as an HTML table (same markup as DataFrame.to_html, index=False).
+
+    One str.join over the rows instead of pandas' per-cell formatter machinery;
+    missing values keep to_html's markers (NaN, <NA>, NaT, None), floats show up
+    to 6 significant digits.
+    """
+    def cell(v) -> str:
+        if isinstance(v, float):
+            t = "NaN" if v != v else f"{v:.6g}"
+        else:
+            t = str(v)
+        return _html.escape(t) if escape else t
+    head = "".join(f"<th>{cell(c)}</th>" for c in df.columns)
+    body = "".join("<tr>" + "".join(f"<td>{cell(v)}</td>" for v in row) + "</tr>"
+                   for row in df.itertuples(index=False, name=None))
+    return (f'<table border="1" class="dataframe"><thead><tr style="text-align: right;">{head}</tr></thead>'
+            f"<tbody>{body}</tbody></table>")
+
 def device_value_card_html(device_id: str, df: pd.DataFrame, typ: str) -> str:
     """
     Build a compact HTML card with 'latest' content metrics for a device.
@@ -773,7 +1345,7 @@ def device_value_card_html(device_id: str, df: pd.DataFrame, typ: str) -> str:
     dfl = df.sort_values("received_at"); row = dfl.iloc[-1]
     cand = [c for c in CONTENT_BY_TYPE.get(typ, CONTENT_BY_TYPE["Other"]) if c in df.columns]
     if not cand:
-        num = [c for c in df.columns if c not in NON_CONTENT and c != "received_at" and pd.api.types.is_numeric_dtype(df[c])]
+        num = [c for c in _numeric_cols(df) if c not in NON_CONTENT]
         cand = num[:4]
     items = []
     for c in cand:
@@ -786,54 +1358,70 @@ def device_value_card_html(device_id: str, df: pd.DataFrame, typ: str) -> str:
     return f'<div class="val-card"><h4>{device_id}</h4><div class="vals">{"".join(items)}</div></div>'
 
 # ---------------- Main (Dashboard build) ----------------
+def _pull_paced(dev: str) -> pd.DataFrame:
+    """device_pull() followed by the friendly inter-device pause (ignored in OFFLINE mode)."""
+    try:
+        return device_pull(dev)
+    finally:
+        if not OFFLINE:
+            time.sleep(DELAY_BETWEEN_DEVICES + random.uniform(0, JITTER_MAX_SECONDS))
+
 RUN_DASH = os.environ.get("RUN_DASH", "1") == "1"
 if RUN_DASH:
     # Collect overview rows (for the table & health) and per-type device buckets.
     overview_rows, debug_cards = [], []
     by_type: Dict[str, List[Tuple[str, pd.DataFrame]]] = {}
+    # One reference time for all debug cards of this build.
+    recent_cutoff = pd.Timestamp.now(tz="UTC") - pd.Timedelta(minutes=DEBUG_RECENT_MINUTES)
 
-    # Pull and prepare each device.
-    for dev in DEVS:
-        status = "ok"; last_ts = None
-        try:
-            df = device_pull(dev)
-            if df.empty:
-                status = "empty"
-            else:
-                df = flatten_payload(df)
-                df = normalize_all(df)
-                last_ts = pd.to_datetime(df["received_at"], utc=True, errors="coerce").max()
-                typ = detect_sensor_type(df, dev)
-                by_type.setdefault(typ, []).append((dev, df))
-        except Exception as e:
-            status = "error"; print(f"[{dev}] ERROR: {e!r}"); df = pd.DataFrame()
+    # Pulls run in the background (PULL_WORKERS at a time); results are prepared in DEVS order
+    # while later devices are still downloading.
+    pull_pool = ThreadPoolExecutor(max_workers=PULL_WORKERS)
+    pulls = [pull_pool.submit(_pull_paced, dev) for dev in DEVS]
 
-        overview_rows.append({"device_id": dev,"records": 0 if df.empty else len(df),
-                              "last_seen_utc": last_ts,"status": status})
+    try:
+        # Pull and prepare each device.
+        for dev, pull in zip(DEVS, pulls):
+            status = "ok"; last_ts = None
+            try:
+                df = pull.result()
+                if df.empty:
+                    status = "empty"
+                else:
+                    df = flatten_payload(df)
+                    df = normalize_all(df)
+                    # device_pull() returns parsed timestamps; parse only as a fallback.
+                    if not isinstance(df["received_at"].dtype, pd.DatetimeTZDtype):
+                        df["received_at"] = pd.to_datetime(df["received_at"], utc=True, errors="coerce", format="ISO8601")
+                    last_ts = df["received_at"].max()
+                    df.attrs["numeric_cols"] = _numeric_cols(df)   # frame is final from here on
+                    typ = detect_sensor_type(df, dev)
+                    by_type.setdefault(typ, []).append((dev, df))
+            except Exception as e:
+                status = "error"; print(f"[{dev}] ERROR: {e!r}"); df = pd.DataFrame()
 
-        # Recent sample table for the debug page (last X minutes).
-        recent_html = "<i>no recent data</i>"
-        try:
-            df_dev = df.copy()
-            if not df_dev.empty:
-                df_dev["received_at"] = pd.to_datetime(df_dev["received_at"], utc=True, errors="coerce")
-                cutoff = datetime.now(timezone.utc) - timedelta(minutes=DEBUG_RECENT_MINUTES)
-                dfr = df_dev[df_dev["received_at"] >= cutoff].sort_values("received_at")
-                prefer = ["received_at","f_port","battery","water_cm","idc_input_ma","vdc_input_v","rssi","snr"]
-                cols = [c for c in prefer if c in dfr.columns]
-                if not cols:
-                    num_cols = [c for c in dfr.columns if c != "received_at" and pd.api.types.is_numeric_dtype(dfr[c])]
-                    cols = ["received_at"] + num_cols[:6]
-                if cols:
-                    recent_html = dfr[cols].tail(12).to_html(index=False)
-        except Exception:
-            pass
+            overview_rows.append({"device_id": dev,"records": 0 if df.empty else len(df),
+                                  "last_seen_utc": last_ts,"status": status})
 
-        debug_cards.append(f"""<div class="card"><h3>{dev}</h3><div>{recent_html}</div></div>""")
+            # Recent sample table for the debug page (last X minutes).
+            recent_html = "<i>no recent data</i>"
+            try:
+                if not df.empty:
+                    dfr = df[df["received_at"] >= recent_cutoff].sort_values("received_at")
+                    prefer = ["received_at","f_port","battery","water_cm","idc_input_ma","vdc_input_v","rssi","snr"]
+                    cols = [c for c in prefer if c in dfr.columns]
+                    if not cols:
+                        num_cols = _numeric_cols(df)
+                        cols = ["received_at"] + num_cols[:6]
+                    if cols:
+                        recent_html = _html_table(dfr[cols].tail(12))
+            except Exception:
+                pass
 
-        # Friendly pause between devices (ignored in OFFLINE mode).
-        if not OFFLINE:
-            time.sleep(DELAY_BETWEEN_DEVICES + random.uniform(0, JITTER_MAX_SECONDS))
+            debug_cards.append(f"""<div class="card"><h3>{dev}</h3><div>{recent_html}</div></div>""")
+    finally:
+        # On an early exit (error, Ctrl-C) queued pulls are cancelled instead of still hitting TTN.
+        pull_pool.shutdown(cancel_futures=True)
 
     # Overview table (HTML), with colored badges.
     ov = pd.DataFrame(overview_rows)
@@ -844,9 +1432,12 @@ if RUN_DASH:
         elif s == "empty": cls += " empty"
         elif s == "error": cls += " err"
         return f'<span class="{cls}">{s}</span>'
+    last_seen_ts = None
     if not ov.empty:
         ov["status"] = ov["status"].apply(_badge)
-        ov["last_seen_utc"] = pd.to_datetime(ov["last_seen_utc"], utc=True, errors="coerce").dt.strftime("%Y-%m-%d %H:%M:%SZ")
+        # Parsed once; the health report reuses it instead of re-parsing the display strings.
+        last_seen_ts = pd.to_datetime(ov["last_seen_utc"], utc=True, errors="coerce").dt.floor("s")
+        ov["last_seen_utc"] = last_seen_ts.dt.strftime("%Y-%m-%d %H:%M:%SZ")
 
     # Value cards (Overview tab), grouped by detected sensor type.
     cards_by_type_html = []
@@ -861,14 +1452,24 @@ if RUN_DASH:
         device_tiles = []
         preferred = PREFERRED_BY_TYPE.get(typ, PREFERRED_BY_TYPE["Other"])
         for dev, df in sorted(items, key=lambda x: x[0]):
-            numeric_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c]) and c not in {"f_port"}]
-            misc_cols = [c for c in ("battery","rssi","snr","vdc_input_v","idc_input_ma") if c in numeric_cols]
+            cache_key = _plot_cache_key(df, typ)
+            cached = _plot_cache_get(dev, cache_key)
+            if cached is not None:
+                # No new rows since the last build → reuse the rendered charts.
+                device_tiles.append(cached)
+                continue
+            numeric_cols = [c for c in _numeric_cols(df) if c != "f_port"]
+            numeric_set = set(numeric_cols)
+            misc_cols = [c for c in ("battery","rssi","snr","vdc_input_v","idc_input_ma") if c in numeric_set]
             plots = []
             if misc_cols:
                 m = to_plot_multi_html(df, misc_cols, "Betrieb (Battery/RSSI/SNR/Power)")
                 if m: plots.append(f'<div class="plot-wrap">{m}</div>')
-            ordered = [c for c in preferred if c in numeric_cols and c not in misc_cols] + \
-                      [c for c in numeric_cols if c not in set(preferred) | set(misc_cols)]
+            # Presence of all candidate columns in one pass; all-NaN columns never reach to_plot_html.
+            filled = df[numeric_cols].notna().any()
+            skip = set(preferred) | set(misc_cols)
+            ordered = [c for c in dict.fromkeys(preferred) if c in numeric_set and c not in misc_cols and filled[c]] + \
+                      [c for c in numeric_cols if c not in skip and filled[c]]
             used = set()
             for col in ordered:
                 if col in used:
@@ -881,7 +1482,9 @@ if RUN_DASH:
                     break
             if not plots:
                 plots.append('<div class="plot-wrap"><em>No numeric fields found.</em></div>')
-            device_tiles.append(f'<div class="device-tile"><h4>{dev}</h4>{"".join(plots)}</div>')
+            tile = f'<div class="device-tile"><h4>{dev}</h4>{"".join(plots)}</div>'
+            _plot_cache_put(dev, cache_key, tile)
+            device_tiles.append(tile)
         type_cards_html.append(f'<div class="card"><h2>{typ}</h2><div class="device-grid">{"".join(device_tiles)}</div></div>')
 
     # ---------- Template rendering (mandatory; no inline CSS/JS from Python) ----------
@@ -889,11 +1492,10 @@ if RUN_DASH:
         """
         Very small {{KEY}} placeholder renderer (no logic, just string replacement).
         """
-        pattern = re.compile(r"{{\s*([A-Z0-9_]+)\s*}}")
-        return pattern.sub(lambda m: str(ctx.get(m.group(1), "")), tpl)
+        return _TPL_RE.sub(lambda m: str(ctx.get(m.group(1), "")), tpl)
 
     stamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%SZ")
-    overview_table_html = ov[["device_id","records","last_seen_utc","status"]].sort_values("device_id").to_html(index=False, escape=False)
+    overview_table_html = _html_table(ov[["device_id","records","last_seen_utc","status"]].sort_values("device_id"), escape=False)
 
     ctx = {
         "STAMP": stamp,
@@ -905,6 +1507,7 @@ if RUN_DASH:
         "OVERVIEW_TABLE": overview_table_html,
         "TYPE_CARDS": "".join(type_cards_html) if type_cards_html else '<div class="card">Keine Daten zum Anzeigen.</div>',
         "DEBUG_CARDS": "".join(debug_cards) if debug_cards else "<div class='card'><i>Keine aktuellen Daten.</i></div>",
+        "PLOTLY_JS": PLOTLY_JS_TAG,
         # Styles/JS are supplied by the external HTML template → placeholders stay empty:
         "STYLE": "",
         "TABS_JS": "",
@@ -922,40 +1525,37 @@ if RUN_DASH:
         raise SystemExit("Dashboard template is missing. Add it at assets/templates/dashboard_template.html (or *.local.html).")
 
     tpl_html = tpl_path.read_text(encoding="utf-8")
+    if "PLOTLY_JS" not in tpl_html:
+        # Older local templates without the placeholder: load plotly.js ahead of the charts.
+        ctx["TYPE_CARDS"] = PLOTLY_JS_TAG + ctx["TYPE_CARDS"]
     html = _render_template(tpl_html, ctx)
 
-    # Write rendered pages to runtime build dir.
-    (ASSETS_BUILD / "data.html").write_text(html, encoding="utf-8")
-    (ASSETS_BUILD / "debug.html").write_text(
-        "<!doctype html><meta charset='utf-8'><title>Debug</title>" + ctx["DEBUG_CARDS"], encoding="utf-8"
-    )
+    # Write rendered pages to runtime build dir (encode once, write bytes; no text-layer/newline pass).
+    (ASSETS_BUILD / "data.html").write_bytes(html.encode("utf-8"))
+    with open(ASSETS_BUILD / "debug.html", "wb") as f:
+        f.write(b"<!doctype html><meta charset='utf-8'><title>Debug</title>")
+        f.write(ctx["DEBUG_CARDS"].encode("utf-8"))
 
     # -------- Health report (TXT + CSV)
-    inc_re = re.compile(DEV_INCLUDE); exc_re = re.compile(DEV_EXCLUDE) if DEV_EXCLUDE else None
-    ov_for_health = ov.copy()
-    if not ov_for_health.empty:
-        ov_for_health["last_seen_utc"] = pd.to_datetime(ov_for_health["last_seen_utc"], utc=True, errors="coerce")
-    health_rows = []
-    for _, row in ov_for_health.iterrows():
-        dev = row["device_id"]
-        if not inc_re.search(dev):
-            continue
-        if exc_re and exc_re.search(dev):
-            continue
-        last_seen = row.get("last_seen_utc"); records = int(row.get("records", 0))
-        status = "OK"; last_seen_str = "–"
-        if pd.isna(last_seen):
-            status = "NO DATA"
-        else:
-            last_seen_str = last_seen.strftime("%Y-%m-%d %H:%M:%SZ")
-            age_h = (datetime.now(timezone.utc) - last_seen).total_seconds()/3600
-            if age_h > STALE_HOURS:
-                status = f"STALE ({age_h:.1f}h)"
-        health_rows.append({"device_id": dev,"records": records,"last_seen": last_seen_str,"status": status})
-
-    health_txt = "\n".join(f"{r['device_id']:24s} | {r['records']:5d} rec | last: {r['last_seen']:20s} | {r['status']}" for r in health_rows)
+    # ov only holds DEVS, which DEV_INCLUDE/DEV_EXCLUDE already filtered.
+    # Status per device from column operations (one reference time for all devices).
+    health = pd.DataFrame(columns=["device_id","records","last_seen","status"])
+    if not ov.empty:
+        age_h = (pd.Timestamp.now(tz="UTC") - last_seen_ts).dt.total_seconds() / 3600
+        stale = age_h > STALE_HOURS
+        status = pd.Series("OK", index=ov.index, dtype=object)
+        if stale.any():
+            status[stale] = "STALE (" + age_h[stale].map("{:.1f}".format) + "h)"
+        status[last_seen_ts.isna()] = "NO DATA"
+        health = pd.DataFrame({"device_id": ov["device_id"],
+                               "records":   ov["records"].fillna(0).astype(int),
+                               "last_seen": ov["last_seen_utc"].fillna("–"),
+                               "status":    status})
+
+    health_txt = "\n".join(f"{d:24s} | {n:5d} rec | last: {ls:20s} | {st}"
+                           for d, n, ls, st in zip(health["device_id"], health["records"], health["last_seen"], health["status"]))
     (ASSETS_BUILD / "devices_used.txt").write_text(health_txt, encoding="utf-8")
-    pd.DataFrame(health_rows).to_csv(ASSETS_BUILD / "devices_used.csv", index=False)
+    health.to_csv(ASSETS_BUILD / "devices_used.csv", index=False)
 
 # ---------------- Smoke-Test (RUN_DASH=0) ----------------
 if __name__ == "__main__":
@@ -987,18 +1587,18 @@ if __name__ == "__main__":
     dev = devs[0]
     parq = DATA / f"{dev}.parquet"
 
-    before_rows = len(pd.read_parquet(parq)) if parq.exists() else None
+    before_rows = pq.ParquetFile(parq).metadata.num_rows if parq.exists() else None  # footer only
     if args.verbose:
         print(f"[{dev}] Start pull… (existing parquet rows: {before_rows})")
 
     df = device_pull(dev)
 
-    after_rows = len(pd.read_parquet(parq)) if parq.exists() else None
+    after_rows = pq.ParquetFile(parq).metadata.num_rows if parq.exists() else None  # footer only
     print(f"[{dev}] Pull OK. df_returned={len(df)} rows; parquet before={before_rows}, after={after_rows}")
 
     if not df.empty:
         try:
-            last_ts = pd.to_datetime(df["received_at"], utc=True, errors="coerce").max()
+            last_ts = df["received_at"].max()  # device_pull() returns parsed UTC timestamps
             print(f"[{dev}] last timestamp (UTC): {last_ts}")
             print(f"[{dev}] columns: {list(df.columns)[:12]}{' …' if len(df.columns)>12 else ''}")
             print(df.tail(3).to_string(index=False))